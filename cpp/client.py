@@ -15,18 +15,68 @@ Usage:
         -p, --port PORT     Server port (default: 9999)
         -s, --socket PATH   Unix socket path (instead of TCP)
         -b, --batch SIZE    Batch size for file mode (default: 100)
+        -w, --window N      Requests kept in flight in file mode (default: 8)
+        --wire FORMAT       Wire format, json or msgpack (default: json)
         -q, --query STRING  Single query string
         -f, --file FILE     File with strings (one per line, supports .gz)
         -o, --output FILE   Output file for results (default: stdout)
         -v, --verbose       Verbose output
 """
 
+import io
+import os
 import socket
 import json
 import gzip
 import sys
 import time
+import queue
+import struct
 import argparse
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+if orjson is not None:
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+else:
+    # Same bytes in, bytes out as orjson
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def json_loads(data):
+        return json.loads(bytes(data))
+
+
+RECV_BUF_SIZE = 1 << 20
+READ_BLOCK_SIZE = 1 << 20
+OUTPUT_BUF_SIZE = 1 << 20
+TCP_BUF_SIZE = 4 << 20
+
+# Most pipelined requests (or bytes) written per sendmsg call
+COALESCE_REQUESTS = 4
+COALESCE_BYTES = 64 * 1024
+
+# msgpack frames start with their body length, 4 bytes big-endian
+FRAME_HEADER = struct.Struct('>I')
+
+# File mode reports progress each time this many more queries complete
+PROGRESS_QUERIES = 100000
 
 
 def connect(host, port, socket_path):
@@ -36,30 +86,240 @@ def connect(host, port, socket_path):
         sock.connect(socket_path)
     else:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Buffer sizes only widen the TCP window if set before connect()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, TCP_BUF_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, TCP_BUF_SIZE)
         sock.connect((host, port))
     sock.settimeout(60)
     return sock
 
 
-def send_request(sock, request_id, queries):
+def encode_request(req, wire='json'):
+    """Encode a request as a JSON line or a length-prefixed msgpack frame"""
+    if wire == 'msgpack':
+        body = msgpack.packb(req, use_bin_type=True)
+        return FRAME_HEADER.pack(len(body)) + body
+    return json_dumps(req) + b"\n"
+
+
+def read_payload(reader, wire='json'):
+    """Return a view of the next response body in the given wire format"""
+    if wire == 'msgpack':
+        return reader.readframe()
+    return reader.readline()
+
+
+def send_request(sock, reader, request_id, queries, wire='json'):
     """Send a request and receive response"""
     if isinstance(queries, str):
         req = {"id": request_id, "query": queries}
     else:
         req = {"id": request_id, "queries": queries}
 
-    data = json.dumps(req) + "\n"
-    sock.sendall(data.encode())
+    sock.sendall(encode_request(req, wire))
 
-    # Read response until newline
-    resp = b""
-    while b"\n" not in resp:
-        chunk = sock.recv(1048576)
-        if not chunk:
-            break
-        resp += chunk
+    payload = read_payload(reader, wire)
+    if wire == 'msgpack':
+        return msgpack.unpackb(payload, raw=False)
+    return json_loads(payload)
 
-    return json.loads(resp.decode().strip())
+
+def parse_response(payload, wire='json'):
+    """Return (id, status, results) from a response body"""
+    if wire == 'msgpack':
+        resp = msgpack.unpackb(payload, raw=False)
+    else:
+        resp = json_loads(payload)
+    return resp.get('id'), resp.get('status'), resp.get('results', [])
+
+
+class RapidgzipReader(io.RawIOBase):
+    """rapidgzip reader that rejects truncated input like stdlib gzip
+
+    rapidgzip can end a truncated stream quietly, so EOF is only trusted
+    once the whole compressed file has been consumed.
+    """
+
+    def __init__(self, path):
+        self._f = rapidgzip.open(path, parallelization=os.cpu_count())
+        self._bits = 8 * os.path.getsize(path)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._f.readinto(b)
+        if not n and len(b) and self._f.tell_compressed() < self._bits:
+            raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+
+def open_binary(path):
+    """Open a file for binary reads, decompressing .gz files.
+
+    Gzip input is decompressed in parallel when rapidgzip is installed,
+    otherwise with stdlib gzip. Either way a truncated .gz raises EOFError.
+    """
+    if not path.endswith('.gz'):
+        return open(path, 'rb')
+    if rapidgzip is not None:
+        return RapidgzipReader(path)
+    return gzip.open(path, 'rb')
+
+
+def iter_batches(path, batch_size):
+    """Yield (batch_start, batch) lists of stripped, non-empty lines from path.
+
+    The file (optionally gzipped) is read in large blocks as it is consumed,
+    so requests can be sent while the rest of it is still being read or
+    decompressed. Each block is decoded and split in one call rather than
+    line by line.
+    """
+    with open_binary(path) as f:
+        batch_start = 0
+        lines = []
+        tail = b''
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            # Universal newlines, as text mode reads them: '\r' and '\r\n' end
+            # lines too, and the empty lines left by '\r\n' are dropped below
+            data = (tail + block).replace(b'\r', b'\n')
+            if block:
+                # Hold back the last, possibly partial, line for the next block
+                cut = data.rfind(b'\n') + 1
+                data, tail = data[:cut], data[cut:]
+            else:
+                tail = b''
+            lines += [line for line in map(str.strip, data.decode().split('\n')) if line]
+
+            full = len(lines) - len(lines) % batch_size
+            for i in range(0, full, batch_size):
+                yield batch_start, lines[i:i + batch_size]
+                batch_start += batch_size
+            del lines[:full]
+
+            if not block:
+                break
+        if lines:
+            yield batch_start, lines
+
+
+def sendmsg_all(sock, buffers):
+    """Write all buffers, one sendmsg (writev) call per partial write"""
+    views = [memoryview(b) for b in buffers]
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if sent:
+            views[0] = views[0][sent:]
+
+
+def send_batches(sock, batches, slots, inflight, wire='json'):
+    """Send (batch_start, batch) requests without waiting for responses.
+
+    Each send takes one of `slots`, which the reader gives back per response,
+    and queues (batch_id, batch_start, batch) on `inflight` so responses can
+    be matched in order. Requests are coalesced into one write while slots
+    are free. Ends by queueing None, or the error that stopped it (a send
+    error, or one reading the input) for the reader to raise.
+    """
+    pending = []
+    pending_bytes = 0
+    sent = []
+
+    def flush():
+        nonlocal pending_bytes
+        sendmsg_all(sock, pending)
+        for item in sent:
+            inflight.put(item)
+        pending.clear()
+        sent.clear()
+        pending_bytes = 0
+
+    try:
+        for batch_start, batch in batches:
+            batch_id = f"b{batch_start}"
+            data = encode_request({"id": batch_id, "queries": batch}, wire)
+            if not slots.acquire(blocking=False):
+                # Window is full: write what we have before waiting on responses
+                if pending:
+                    flush()
+                slots.acquire()
+            pending.append(data)
+            pending_bytes += len(data)
+            sent.append((batch_id, batch_start, batch))
+            if len(pending) >= COALESCE_REQUESTS or pending_bytes >= COALESCE_BYTES:
+                flush()
+        if pending:
+            flush()
+    except Exception as e:
+        inflight.put(e)
+    else:
+        inflight.put(None)
+
+
+class ResponseReader:
+    """Reads newline-framed or length-prefixed responses into a reusable receive buffer"""
+
+    def __init__(self, sock, size=RECV_BUF_SIZE):
+        self.sock = sock
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0  # first byte not yet returned
+        self.end = 0    # end of received data
+
+    def _compact(self):
+        """Move any bytes received past the previous response to the front"""
+        if self.start:
+            remaining = self.end - self.start
+            self.buf[:remaining] = self.buf[self.start:self.end]
+            self.start = 0
+            self.end = remaining
+
+    def _recv(self, need=0):
+        """Receive more data, first growing the buffer to hold at least need bytes"""
+        if self.end == len(self.buf) or need > len(self.buf):
+            # Response larger than the buffer: grow it, keeping what we have
+            grown = bytearray(max(2 * len(self.buf), need))
+            grown[:self.end] = self.view[:self.end]
+            self.buf = grown
+            self.view = memoryview(grown)
+
+        n = self.sock.recv_into(self.view[self.end:])
+        if not n:
+            raise ConnectionError("Server closed connection")
+        self.end += n
+
+    def readline(self):
+        """Return a view of the next line, minus its newline, valid until the next call"""
+        self._compact()
+        search_from = 0
+        while True:
+            idx = self.buf.find(b"\n", search_from, self.end)
+            if idx >= 0:
+                self.start = idx + 1
+                return self.view[:idx]
+            search_from = self.end
+            self._recv()
+
+    def readframe(self):
+        """Return a view of the next length-prefixed frame body, valid until the next call"""
+        self._compact()
+        while self.end < FRAME_HEADER.size:
+            self._recv()
+        size = FRAME_HEADER.size + FRAME_HEADER.unpack_from(self.buf)[0]
+        while self.end < size:
+            self._recv(size)
+        self.start = size
+        return self.view[FRAME_HEADER.size:size]
 
 
 def format_result(result, verbose=False):
@@ -76,6 +336,9 @@ def main():
     parser.add_argument('-p', '--port', type=int, default=9999, help='Server port')
     parser.add_argument('-s', '--socket', help='Unix socket path')
     parser.add_argument('-b', '--batch', type=int, default=100, help='Batch size')
+    parser.add_argument('-w', '--window', type=int, default=8, help='Requests in flight (file mode)')
+    parser.add_argument('--wire', choices=('json', 'msgpack'), default='json',
+                        help='Wire format (msgpack frames are length-prefixed)')
     parser.add_argument('-q', '--query', help='Single query string')
     parser.add_argument('-f', '--file', help='File with strings to query')
     parser.add_argument('-o', '--output', help='Output file')
@@ -86,78 +349,96 @@ def main():
     if not args.query and not args.file:
         parser.print_help()
         sys.exit(1)
+    if args.window < 1:
+        parser.error('--window must be at least 1')
+    if args.wire == 'msgpack' and msgpack is None:
+        parser.error('--wire=msgpack requires the msgpack package')
 
     # Setup output
-    out = open(args.output, 'w') if args.output else sys.stdout
+    # Results are written as encoded bytes straight to a buffered binary
+    # stream, bypassing print() and the text layer
+    if args.output:
+        out = open(args.output, 'wb', buffering=OUTPUT_BUF_SIZE)
+    else:
+        out = sys.stdout.buffer
+    write = out.write
 
     # Connect
     sock = connect(args.host, args.port, args.socket)
+    reader = ResponseReader(sock)
 
-    start_time = time.time()
+    start_time = time.perf_counter()
     total_queries = 0
     total_matches = 0
 
     try:
         if args.query:
             # Single query mode
-            resp = send_request(sock, "q1", args.query)
+            resp = send_request(sock, reader, "q1", args.query, args.wire)
             total_queries = 1
 
             if resp['status'] == 200:
                 for match in resp.get('results', []):
                     total_matches += 1
-                    print(format_result(match, args.verbose), file=out)
+                    write(f"{format_result(match, args.verbose)}\n".encode())
             elif args.verbose:
                 print(f"No matches (status {resp['status']})", file=sys.stderr)
 
         else:
             # File mode
             if args.verbose:
-                print(f"Loading strings from {args.file}...", file=sys.stderr)
-
-            if args.file.endswith('.gz'):
-                with gzip.open(args.file, 'rt') as f:
-                    lines = [line.strip() for line in f if line.strip()]
-            else:
-                with open(args.file, 'r') as f:
-                    lines = [line.strip() for line in f if line.strip()]
-
-            if args.verbose:
-                print(f"Loaded {len(lines)} strings, processing in batches of {args.batch}", file=sys.stderr)
-
-            # Process in batches
-            for batch_start in range(0, len(lines), args.batch):
-                batch_end = min(batch_start + args.batch, len(lines))
-                batch = lines[batch_start:batch_end]
-                batch_id = f"b{batch_start}"
-
-                resp = send_request(sock, batch_id, batch)
+                print(f"Streaming strings from {args.file} in batches of {args.batch}", file=sys.stderr)
+
+            # Pipeline batches: a sender thread keeps up to --window requests
+            # in flight while this thread reads responses in order
+            slots = threading.BoundedSemaphore(args.window)
+            inflight = queue.Queue()
+            batches = iter_batches(args.file, args.batch)
+            sender = threading.Thread(target=send_batches, args=(sock, batches, slots, inflight, args.wire),
+                                      daemon=True)
+            sender.start()
+
+            next_progress = PROGRESS_QUERIES
+            while True:
+                item = inflight.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                batch_id, batch_start, batch = item
+
+                resp_id, status, results = parse_response(read_payload(reader, args.wire), args.wire)
+                slots.release()
                 total_queries += len(batch)
 
-                if resp['status'] in (200, 404):
-                    for i, result in enumerate(resp.get('results', [])):
+                if status in (200, 404):
+                    if resp_id != batch_id:
+                        raise RuntimeError(f"Response {resp_id} does not match request {batch_id}")
+                    for result in results:
                         line_idx = batch_start + result['index']
                         for match in result.get('matches', []):
                             total_matches += 1
                             if args.verbose:
-                                print(f"[{line_idx}] {lines[line_idx][:50]}...", file=out)
-                                print(format_result(match, True), file=out)
+                                write(f"[{line_idx}] {batch[result['index']][:50]}...\n"
+                                      f"{format_result(match, True)}\n".encode())
                             else:
-                                print(f"{line_idx}\t{format_result(match)}", file=out)
+                                write(f"{line_idx}\t{format_result(match)}\n".encode())
 
-                # Progress
-                if args.verbose and batch_start % (max(1, len(lines) // 10) * args.batch // args.batch * args.batch) < args.batch:
-                    elapsed = time.time() - start_time
+                # Progress (the total is unknown until the file is exhausted)
+                if args.verbose and total_queries >= next_progress:
+                    elapsed = time.perf_counter() - start_time
                     rate = total_queries / elapsed if elapsed > 0 else 0
-                    pct = batch_end / len(lines) * 100
-                    print(f"Progress: {pct:.0f}% ({total_queries} queries, {rate:.0f}/sec)", file=sys.stderr)
+                    print(f"Progress: {total_queries} queries, {rate:.0f}/sec", file=sys.stderr)
+                    next_progress += PROGRESS_QUERIES
 
     finally:
         sock.close()
-        if out != sys.stdout:
+        if out is sys.stdout.buffer:
+            out.flush()
+        else:
             out.close()
 
-    elapsed = time.time() - start_time
+    elapsed = time.perf_counter() - start_time
 
     if args.verbose:
         print(f"\nCompleted: {total_queries} queries, {total_matches} matches in {elapsed:.2f}s", file=sys.stderr)
@@ -0,0 +1,347 @@
+#pragma once
+
+#include "json_utils.hpp"
+
+#include <cstdint>
+#include <string>
+#include <string_view>
+#include <vector>
+
+namespace prefix_match {
+
+// Simple msgpack utilities for the length-prefixed wire format
+// Mirrors json_utils.hpp: decodes the request map and encodes the same
+// response maps, nothing more. Each frame on the wire is a 4-byte
+// big-endian body length followed by one msgpack map.
+
+constexpr size_t MSGPACK_FRAME_HEADER = 4;
+constexpr uint32_t MSGPACK_MAX_FRAME = 64u << 20;  // Keeps the first header byte below any JSON byte
+
+// Read the 4-byte big-endian frame length at pos
+inline uint32_t read_frame_length(std::string_view s, size_t pos) {
+    const auto* p = reinterpret_cast<const unsigned char*>(s.data() + pos);
+    return (uint32_t(p[0]) << 24) | (uint32_t(p[1]) << 16) | (uint32_t(p[2]) << 8) | uint32_t(p[3]);
+}
+
+// Sequential msgpack decoder over a single frame body
+class MsgpackReader {
+public:
+    explicit MsgpackReader(std::string_view data) : data_(data), pos_(0), ok_(true) {}
+
+    bool ok() const { return ok_; }
+
+    // Read a map header, returns the number of key/value pairs
+    uint32_t read_map() {
+        uint8_t tag = byte();
+        if ((tag & 0xf0) == 0x80) return tag & 0x0f;
+        if (tag == 0xde) return uint_be(2);
+        if (tag == 0xdf) return uint_be(4);
+        ok_ = false;
+        return 0;
+    }
+
+    // Read an array header, returns the number of elements
+    uint32_t read_array() {
+        uint8_t tag = byte();
+        if ((tag & 0xf0) == 0x90) return tag & 0x0f;
+        if (tag == 0xdc) return uint_be(2);
+        if (tag == 0xdd) return uint_be(4);
+        ok_ = false;
+        return 0;
+    }
+
+    // Read a str (or bin) value
+    std::string_view read_string() {
+        uint8_t tag = byte();
+        size_t len;
+        if ((tag & 0xe0) == 0xa0) len = tag & 0x1f;
+        else if (tag == 0xd9 || tag == 0xc4) len = uint_be(1);
+        else if (tag == 0xda || tag == 0xc5) len = uint_be(2);
+        else if (tag == 0xdb || tag == 0xc6) len = uint_be(4);
+        else {
+            ok_ = false;
+            return {};
+        }
+        return take(len);
+    }
+
+    // Skip any value, including nested maps and arrays
+    void skip() {
+        uint8_t tag = peek();
+        if (!ok_) return;
+
+        if (tag <= 0x7f || tag >= 0xe0 || tag == 0xc0 || tag == 0xc2 || tag == 0xc3) {
+            ++pos_;
+        } else if ((tag & 0xe0) == 0xa0 || tag == 0xd9 || tag == 0xda || tag == 0xdb ||
+                   tag == 0xc4 || tag == 0xc5 || tag == 0xc6) {
+            read_string();
+        } else if ((tag & 0xf0) == 0x80 || tag == 0xde || tag == 0xdf) {
+            uint32_t n = read_map();
+            for (uint32_t i = 0; i < n && ok_; ++i) {
+                skip();
+                skip();
+            }
+        } else if ((tag & 0xf0) == 0x90 || tag == 0xdc || tag == 0xdd) {
+            uint32_t n = read_array();
+            for (uint32_t i = 0; i < n && ok_; ++i) {
+                skip();
+            }
+        } else {
+            ++pos_;
+            switch (tag) {
+                case 0xcc: case 0xd0: take(1); break;
+                case 0xcd: case 0xd1: take(2); break;
+                case 0xca: case 0xce: case 0xd2: take(4); break;
+                case 0xcb: case 0xcf: case 0xd3: take(8); break;
+                case 0xd4: take(2); break;   // fixext 1
+                case 0xd5: take(3); break;   // fixext 2
+                case 0xd6: take(5); break;   // fixext 4
+                case 0xd7: take(9); break;   // fixext 8
+                case 0xd8: take(17); break;  // fixext 16
+                case 0xc7: take(uint_be(1) + 1); break;
+                case 0xc8: take(uint_be(2) + 1); break;
+                case 0xc9: take(uint_be(4) + 1); break;
+                default: ok_ = false;
+            }
+        }
+    }
+
+private:
+    std::string_view data_;
+    size_t pos_;
+    bool ok_;
+
+    uint8_t peek() {
+        if (pos_ >= data_.size()) {
+            ok_ = false;
+            return 0;
+        }
+        return static_cast<uint8_t>(data_[pos_]);
+    }
+
+    uint8_t byte() {
+        uint8_t b = peek();
+        if (ok_) ++pos_;
+        return b;
+    }
+
+    std::string_view take(size_t len) {
+        if (!ok_ || len > data_.size() - pos_) {
+            ok_ = false;
+            return {};
+        }
+        std::string_view out = data_.substr(pos_, len);
+        pos_ += len;
+        return out;
+    }
+
+    uint32_t uint_be(size_t width) {
+        std::string_view raw = take(width);
+        uint32_t v = 0;
+        for (char c : raw) {
+            v = (v << 8) | static_cast<uint8_t>(c);
+        }
+        return v;
+    }
+};
+
+// Parse incoming msgpack request
+// Format: {"id": "...", "query": "..."} or {"id": "...", "queries": ["...", "..."]}
+inline JsonRequest parse_msgpack_request(std::string_view body) {
+    JsonRequest req;
+    MsgpackReader r(body);
+
+    uint32_t fields = r.read_map();
+    if (!r.ok()) {
+        req.error = "Expected map";
+        return req;
+    }
+
+    bool has_id = false;
+    bool has_query = false;
+
+    for (uint32_t f = 0; f < fields; ++f) {
+        std::string_view key = r.read_string();
+        if (!r.ok()) {
+            req.error = "Invalid key string";
+            return req;
+        }
+
+        if (key == "id") {
+            req.id = std::string(r.read_string());
+            if (!r.ok()) {
+                req.error = "Invalid 'id' value";
+                return req;
+            }
+            has_id = true;
+        } else if (key == "query") {
+            req.queries.emplace_back(r.read_string());
+            if (!r.ok()) {
+                req.error = "Invalid 'query' value";
+                return req;
+            }
+            has_query = true;
+        } else if (key == "queries") {
+            uint32_t n = r.read_array();
+            if (!r.ok()) {
+                req.error = "Expected array for queries";
+                return req;
+            }
+            req.queries.reserve(req.queries.size() + n);
+            for (uint32_t i = 0; i < n; ++i) {
+                req.queries.emplace_back(r.read_string());
+                if (!r.ok()) {
+                    req.error = "Invalid string in queries array";
+                    return req;
+                }
+            }
+            has_query = true;
+        } else {
+            r.skip();
+            if (!r.ok()) {
+                req.error = "Invalid value";
+                return req;
+            }
+        }
+    }
+
+    if (has_id && has_query) {
+        req.valid = true;
+    } else if (!has_id) {
+        req.error = "Missing 'id' field";
+    } else {
+        req.error = "Missing 'query' or 'queries' field";
+    }
+    return req;
+}
+
+// Append-only msgpack encoder
+class MsgpackWriter {
+public:
+    std::string out;
+
+    void map(uint32_t n) { header(n, 0x80, 0xde, 0xdf); }
+    void array(uint32_t n) { header(n, 0x90, 0xdc, 0xdd); }
+
+    void str(std::string_view s) {
+        size_t n = s.size();
+        if (n < 32) {
+            out += static_cast<char>(0xa0 | n);
+        } else if (n <= 0xff) {
+            out += static_cast<char>(0xd9);
+            be(n, 1);
+        } else if (n <= 0xffff) {
+            out += static_cast<char>(0xda);
+            be(n, 2);
+        } else {
+            out += static_cast<char>(0xdb);
+            be(n, 4);
+        }
+        out.append(s.data(), n);
+    }
+
+    void uint(uint32_t v) {
+        if (v < 0x80) {
+            out += static_cast<char>(v);
+        } else if (v <= 0xff) {
+            out += static_cast<char>(0xcc);
+            be(v, 1);
+        } else if (v <= 0xffff) {
+            out += static_cast<char>(0xcd);
+            be(v, 2);
+        } else {
+            out += static_cast<char>(0xce);
+            be(v, 4);
+        }
+    }
+
+    // Write a match as {"category", "id", "pattern", "match"}
+    void match(const MatchOutput& m) {
+        map(4);
+        str("category"); str(m.category);
+        str("id"); str(m.id);
+        str("pattern"); str(m.pattern);
+        str("match"); str(m.match);
+    }
+
+    // Prefix the body with its 4-byte big-endian length
+    std::string frame() {
+        std::string framed;
+        framed.reserve(MSGPACK_FRAME_HEADER + out.size());
+        uint32_t n = static_cast<uint32_t>(out.size());
+        framed += static_cast<char>(n >> 24);
+        framed += static_cast<char>(n >> 16);
+        framed += static_cast<char>(n >> 8);
+        framed += static_cast<char>(n);
+        framed += out;
+        return framed;
+    }
+
+private:
+    void header(uint32_t n, uint8_t fix, uint8_t tag16, uint8_t tag32) {
+        if (n < 16) {
+            out += static_cast<char>(fix | n);
+        } else if (n <= 0xffff) {
+            out += static_cast<char>(tag16);
+            be(n, 2);
+        } else {
+            out += static_cast<char>(tag32);
+            be(n, 4);
+        }
+    }
+
+    void be(uint32_t v, size_t width) {
+        for (size_t i = width; i-- > 0;) {
+            out += static_cast<char>(v >> (8 * i));
+        }
+    }
+};
+
+// Build framed msgpack response for single query
+inline std::string build_msgpack_response(const std::string& id, int status,
+                                          const std::vector<MatchOutput>& matches) {
+    MsgpackWriter w;
+    w.map(3);
+    w.str("id"); w.str(id);
+    w.str("status"); w.uint(status);
+    w.str("results");
+    w.array(matches.size());
+    for (const auto& m : matches) {
+        w.match(m);
+    }
+    return w.frame();
+}
+
+// Build framed msgpack response for batch query
+inline std::string build_msgpack_batch_response(const std::string& id, int status,
+                                                const std::vector<QueryResult>& results) {
+    MsgpackWriter w;
+    w.map(3);
+    w.str("id"); w.str(id);
+    w.str("status"); w.uint(status);
+    w.str("results");
+    w.array(results.size());
+    for (const auto& r : results) {
+        w.map(2);
+        w.str("index"); w.uint(r.index);
+        w.str("matches");
+        w.array(r.matches.size());
+        for (const auto& m : r.matches) {
+            w.match(m);
+        }
+    }
+    return w.frame();
+}
+
+// Build framed msgpack error response
+inline std::string build_msgpack_error_response(const std::string& id, int status,
+                                                const std::string& error) {
+    MsgpackWriter w;
+    w.map(3);
+    w.str("id"); w.str(id);
+    w.str("status"); w.uint(status);
+    w.str("error"); w.str(error);
+    return w.frame();
+}
+
+} // namespace prefix_match
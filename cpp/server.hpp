@@ -2,6 +2,7 @@
 
 #include "pattern_trie.hpp"
 #include "json_utils.hpp"
+#include "msgpack_utils.hpp"
 
 #include <string>
 #include <thread>
@@ -15,6 +16,7 @@
 #include <sys/socket.h>
 #include <sys/un.h>
 #include <netinet/in.h>
+#include <netinet/tcp.h>
 #include <arpa/inet.h>
 #include <unistd.h>
 #include <fcntl.h>
@@ -202,6 +204,12 @@ private:
         tv.tv_usec = 0;
         setsockopt(client_fd, SOL_SOCKET, SO_RCVTIMEO, &tv, sizeof(tv));
 
+        // Send pipelined responses immediately rather than waiting on Nagle
+        if (!is_unix_socket_) {
+            int nodelay = 1;
+            setsockopt(client_fd, IPPROTO_TCP, TCP_NODELAY, &nodelay, sizeof(nodelay));
+        }
+
         // Create per-connection match context
         MatchContext ctx;
         ctx.ensure_capacity(trie_.get_pattern_count());
@@ -210,6 +218,12 @@ private:
         buffer.reserve(65536);
         char read_buf[8192];
 
+        // The first byte picks the wire format for the whole connection:
+        // JSON starts with '{' or whitespace, a msgpack frame with the
+        // high byte of its length (always below MSGPACK_MAX_FRAME >> 24)
+        bool msgpack = false;
+        bool wire_known = false;
+
         while (running_) {
             // Read data
             ssize_t n = recv(client_fd, read_buf, sizeof(read_buf), 0);
@@ -219,44 +233,15 @@ private:
 
             buffer.append(read_buf, n);
 
-            // Try to extract complete JSON objects
-            // We look for matching braces to find complete objects
-            size_t start = 0;
-            while (start < buffer.size()) {
-                // Skip leading whitespace
-                while (start < buffer.size() &&
-                       (buffer[start] == ' ' || buffer[start] == '\t' ||
-                        buffer[start] == '\n' || buffer[start] == '\r')) {
-                    ++start;
-                }
-                if (start >= buffer.size()) break;
-
-                if (buffer[start] != '{') {
-                    // Invalid data - skip to next line or brace
-                    size_t next = buffer.find('{', start);
-                    if (next == std::string::npos) {
-                        buffer.clear();
-                        break;
-                    }
-                    start = next;
-                }
-
-                // Find matching closing brace
-                size_t end = find_json_end(buffer, start);
-                if (end == std::string::npos) {
-                    // Incomplete JSON, wait for more data
-                    break;
-                }
-
-                // Extract and process the JSON object
-                std::string json = buffer.substr(start, end - start + 1);
-                std::string response = process_request(json, ctx);
-
-                // Send response with newline delimiter
-                response += "\n";
-                send(client_fd, response.data(), response.size(), 0);
+            if (!wire_known) {
+                msgpack = static_cast<unsigned char>(buffer[0]) <= (MSGPACK_MAX_FRAME >> 24);
+                wire_known = true;
+            }
 
-                start = end + 1;
+            size_t start = msgpack ? process_frames(client_fd, buffer, ctx)
+                                   : process_json(client_fd, buffer, ctx);
+            if (start == std::string::npos) {
+                break;  // Unrecoverable framing error, or the client went away
             }
 
             // Remove processed data from buffer
@@ -268,6 +253,91 @@ private:
         close(client_fd);
     }
 
+    // Answer every complete JSON object in buffer, returns the bytes consumed
+    // or npos if a response could not be sent
+    size_t process_json(int client_fd, const std::string& buffer, MatchContext& ctx) {
+        // Try to extract complete JSON objects
+        // We look for matching braces to find complete objects
+        size_t start = 0;
+        while (start < buffer.size()) {
+            // Skip leading whitespace
+            while (start < buffer.size() &&
+                   (buffer[start] == ' ' || buffer[start] == '\t' ||
+                    buffer[start] == '\n' || buffer[start] == '\r')) {
+                ++start;
+            }
+            if (start >= buffer.size()) break;
+
+            if (buffer[start] != '{') {
+                // Invalid data - skip to next line or brace
+                size_t next = buffer.find('{', start);
+                if (next == std::string::npos) {
+                    return buffer.size();
+                }
+                start = next;
+            }
+
+            // Find matching closing brace
+            size_t end = find_json_end(buffer, start);
+            if (end == std::string::npos) {
+                // Incomplete JSON, wait for more data
+                break;
+            }
+
+            // Extract and process the JSON object
+            std::string json = buffer.substr(start, end - start + 1);
+            std::string response = process_request(parse_request(json), ctx, false);
+
+            // Send response with newline delimiter
+            response += "\n";
+            if (!send_all(client_fd, response)) {
+                return std::string::npos;
+            }
+
+            start = end + 1;
+        }
+
+        return start;
+    }
+
+    // Answer every complete length-prefixed msgpack frame in buffer, returns
+    // the bytes consumed or npos if a frame is too large to be valid or a
+    // response could not be sent
+    size_t process_frames(int client_fd, const std::string& buffer, MatchContext& ctx) {
+        size_t start = 0;
+        while (buffer.size() - start >= MSGPACK_FRAME_HEADER) {
+            uint32_t len = read_frame_length(buffer, start);
+            if (len > MSGPACK_MAX_FRAME) {
+                send_all(client_fd, build_msgpack_error_response("", 413, "Frame too large"));
+                return std::string::npos;
+            }
+            if (buffer.size() - start - MSGPACK_FRAME_HEADER < len) {
+                break;  // Incomplete frame, wait for more data
+            }
+
+            std::string_view body(buffer.data() + start + MSGPACK_FRAME_HEADER, len);
+            if (!send_all(client_fd, process_request(parse_msgpack_request(body), ctx, true))) {
+                return std::string::npos;
+            }
+
+            start += MSGPACK_FRAME_HEADER + len;
+        }
+        return start;
+    }
+
+    // Send the whole response, retrying short writes. Returns false once the
+    // client has gone away; MSG_NOSIGNAL turns that into EPIPE, not SIGPIPE
+    bool send_all(int client_fd, const std::string& data) {
+        size_t sent = 0;
+        while (sent < data.size()) {
+            ssize_t n = send(client_fd, data.data() + sent, data.size() - sent, MSG_NOSIGNAL);
+            if (n < 0 && errno == EINTR) continue;
+            if (n <= 0) return false;
+            sent += n;
+        }
+        return true;
+    }
+
     // Find the end of a JSON object (matching closing brace)
     size_t find_json_end(const std::string& s, size_t start) {
         if (start >= s.size() || s[start] != '{') {
@@ -311,15 +381,15 @@ private:
         return std::string::npos;  // Incomplete
     }
 
-    std::string process_request(const std::string& json, MatchContext& ctx) {
-        JsonRequest req = parse_request(json);
-
+    std::string process_request(const JsonRequest& req, MatchContext& ctx, bool msgpack) {
         if (!req.valid) {
-            return build_error_response(req.id, 400, req.error);
+            return msgpack ? build_msgpack_error_response(req.id, 400, req.error)
+                           : build_error_response(req.id, 400, req.error);
         }
 
         if (req.queries.empty()) {
-            return build_error_response(req.id, 400, "No queries provided");
+            return msgpack ? build_msgpack_error_response(req.id, 400, "No queries provided")
+                           : build_error_response(req.id, 400, "No queries provided");
         }
 
         bool is_batch = (req.queries.size() > 1);
@@ -369,7 +439,9 @@ private:
                 }
             }
 
-            return build_batch_response(req.id, any_matches ? 200 : 404, results);
+            int status = any_matches ? 200 : 404;
+            return msgpack ? build_msgpack_batch_response(req.id, status, results)
+                           : build_batch_response(req.id, status, results);
 
         } else {
             // Single query
@@ -398,7 +470,8 @@ private:
             }
 
             int status = output.empty() ? 404 : 200;
-            return build_response(req.id, status, output);
+            return msgpack ? build_msgpack_response(req.id, status, output)
+                           : build_response(req.id, status, output);
         }
     }
 };
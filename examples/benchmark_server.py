@@ -17,21 +17,119 @@ Usage:
 """
 
 import argparse
+import asyncio
+import io
+import os
 import socket
 import json
+import math
 import time
+import struct
 import sys
 import gzip
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+import tempfile
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+if orjson is not None:
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+else:
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def json_loads(data):
+        return json.loads(bytes(data))
+
+
+FRAME_HEADER = struct.Struct(">I")  # msgpack frame body length
+
+# Packed URLs are joined by the array separator of each wire format
+URL_SEPARATORS = {"json": b",", "msgpack": b""}
+
+# Timed request ids are fixed width, so every request of a window has the
+# same size
+REQUEST_ID = "c%04d-r%08d"
+
+# Not defined on every platform; the flag only batches TCP segments
+MSG_MORE = getattr(socket, "MSG_MORE", 0)
+
+# Largest response line a client stream will buffer
+STREAM_LIMIT = 1 << 26
+TCP_BUF_SIZE = 4 << 20
+GZIP_READ_SIZE = 128 * 1024
+
+COALESCE_REQUESTS = 4
+COALESCE_BYTES = 64 * 1024
+
+# Opens every match object in a response. The server escapes quotes inside
+# strings, so this byte sequence can only occur as real JSON structure.
+MATCH_MARKER = b'{"category":'
+
+NS_PER_MS = 1_000_000
+NS_PER_SEC = 1_000_000_000
+
+# Seconds a benchmark process waits for the others to finish warming up
+BARRIER_TIMEOUT = 60
+
+
+class RapidgzipReader(io.RawIOBase):
+    """rapidgzip reader that raises EOFError on truncated input."""
+
+    def __init__(self, path):
+        self._f = rapidgzip.open(path, parallelization=os.cpu_count())
+        self._bits = 8 * os.path.getsize(path)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._f.readinto(b)
+        # rapidgzip may stop quietly before the end of a truncated file
+        if not n and len(b) and self._f.tell_compressed() < self._bits:
+            raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+
+def open_text(path):
+    """Open a text file for reading, decompressing .gz files (truncated input raises EOFError)."""
+    if not path.endswith('.gz'):
+        return open(path, 'r')
+    if rapidgzip is not None:
+        raw = RapidgzipReader(path)
+    else:
+        raw = gzip.open(path, 'rb')
+    return io.TextIOWrapper(io.BufferedReader(raw, buffer_size=GZIP_READ_SIZE))
 
 
 def load_urls(filepath, limit=5000):
     """Load URLs from file (supports .gz compression)."""
     urls = []
-    opener = gzip.open if filepath.endswith('.gz') else open
-    mode = 'rt' if filepath.endswith('.gz') else 'r'
-
-    with opener(filepath, mode) as f:
+    with open_text(filepath) as f:
         for i, line in enumerate(f):
             if i >= limit:
                 break
@@ -46,70 +144,424 @@ def create_socket(socket_path=None, host=None, port=None):
         sock.connect(socket_path)
     else:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, TCP_BUF_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, TCP_BUF_SIZE)
         sock.connect((host, port))
     return sock
 
 
-def client_worker(client_id, urls, num_requests, batch_size, socket_path=None, host=None, port=None):
-    """Worker function for a single benchmark client."""
+def pack_urls(urls, wire="json"):
+    """Copy encoded URLs and their offsets into a new SharedMemory; the caller unlinks it."""
+    sep = URL_SEPARATORS[wire]
+    encode = msgpack.packb if wire == "msgpack" else json_dumps
+    encoded = [encode(url) for url in urls]
+    # URL i ends a separator short of offsets[i + 1], so any run of URLs is
+    # one slice that is already an array body
+    offsets = array("q", itertools.accumulate((len(e) + len(sep) for e in encoded), initial=0))
+    blob = sep.join(encoded)
+
+    header = offsets.itemsize * len(offsets)
+    shm = shared_memory.SharedMemory(create=True, size=header + len(blob))
+    shm.buf[:header] = offsets.tobytes()
+    shm.buf[header:header + len(blob)] = blob
+    return shm
+
+
+class SharedUrls:
+    """Read-only view of URLs packed into shared memory by pack_urls."""
+
+    def __init__(self, name, count, wire="json"):
+        self.count = count
+        self.wire = wire
+        self.separator = URL_SEPARATORS[wire]
+        self._shm = shared_memory.SharedMemory(name=name)
+        header = 8 * (count + 1)
+        self._offsets = self._shm.buf[:header].cast("q")
+        self._blob = self._shm.buf[header:]
+
+    def span(self, start, stop):
+        """Return URLs [start, stop) as encoded strings joined by the separator."""
+        return bytes(self._blob[self._offsets[start]:self._offsets[stop] - len(self.separator)])
+
+    def close(self):
+        self._offsets.release()
+        self._blob.release()
+        self._shm.close()
+
+
+def build_windows(urls, batch_size, num_requests):
+    """Pre-encode the distinct (queries, num_queries) batches that requests cycle through."""
+    # Request r starts at URL (r * batch_size) % urls.count, so batches repeat
+    cycle = urls.count // math.gcd(urls.count, batch_size)
+    windows = []
+    for req_num in range(min(cycle, num_requests)):
+        batch_start = (req_num * batch_size) % urls.count
+        batch_stop = min(batch_start + batch_size, urls.count)
+        body = urls.span(batch_start, batch_stop)
+        num_queries = batch_stop - batch_start
+        if num_queries < batch_size:
+            wrapped = min(batch_size - num_queries, urls.count)
+            body += urls.separator + urls.span(0, wrapped)
+            num_queries += wrapped
+        if urls.wire == "msgpack":
+            windows.append((msgpack.Packer().pack_array_header(num_queries) + body, num_queries))
+        else:
+            windows.append((b"[" + body + b"]", num_queries))
+    return windows
+
+
+def request_parts(request_id, queries_size, wire="json"):
+    """Return (head, tail), the bytes of a request before and after its queries."""
+    if wire == "msgpack":
+        # fixmap of 2: "id" -> request_id, "queries" -> the packed array
+        head = b"\x82\xa2id%s\xa7queries" % msgpack.packb(request_id)
+        return FRAME_HEADER.pack(len(head) + queries_size) + head, b""
+    return b'{"id":"%s","queries":' % request_id.encode(), b"}\n"
+
+
+def encode_request(request_id, queries, wire="json"):
+    """Splice a request id and pre-encoded queries into a request line or frame."""
+    head, tail = request_parts(request_id, len(queries), wire)
+    return head + queries + tail
+
+
+async def read_response(reader, wire="json"):
+    """Read the next response line, or the body of the next length-prefixed frame."""
+    if wire == "msgpack":
+        header = await reader.readexactly(FRAME_HEADER.size)
+        return await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+    return await reader.readuntil(b"\n")
+
+
+def decode_response(payload, wire="json"):
+    """Decode a response read by read_response."""
+    if wire == "msgpack":
+        return msgpack.unpackb(payload, raw=False)
+    return json_loads(payload)
+
+
+class RequestCache:
+    """Each window's queries (and request tail) preserialized into a temp file for sendfile."""
+
+    def __init__(self, windows, wire="json"):
+        self.wire = wire
+        self.file = tempfile.TemporaryFile()
+        self.spans = []  # (offset, length) of each window's queries and tail
+        self._queries_sizes = []
+        _, tail = request_parts("", 0, wire)
+        for queries, _ in windows:
+            self.spans.append((self.file.tell(), len(queries) + len(tail)))
+            self._queries_sizes.append(len(queries))
+            self.file.write(queries + tail)
+        self.file.flush()
+
+    def head(self, request_id, window_num):
+        """Return the bytes of a request that precede window_num's cached span."""
+        return request_parts(request_id, self._queries_sizes[window_num], self.wire)[0]
+
+    def close(self):
+        self.file.close()
+
+
+class SendfileWriter:
+    """Writes requests to a connection's socket with sendfile while its transport keeps reading."""
+
+    def __init__(self, writer):
+        # loop.sendfile() pauses reading for its duration, deadlocking against
+        # a server blocked on unread responses. add_writer is refused on the
+        # transport's own fd, hence the dup. Only used after the warm-up, so
+        # the transport has nothing buffered to reorder against.
+        self._loop = asyncio.get_running_loop()
+        self._sock = socket.socket(fileno=os.dup(writer.get_extra_info("socket").fileno()))
+
+    async def _writable(self):
+        waiter = self._loop.create_future()
+        fd = self._sock.fileno()
+        self._loop.add_writer(fd, lambda: waiter.done() or waiter.set_result(None))
+        try:
+            await waiter
+        finally:
+            self._loop.remove_writer(fd)
+
+    async def send(self, data, flags=0):
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[self._sock.send(view, flags):]
+            except BlockingIOError:
+                await self._writable()
+
+    async def sendfile(self, file, offset, count):
+        while count:
+            try:
+                sent = os.sendfile(self._sock.fileno(), file.fileno(), offset, count)
+            except BlockingIOError:
+                await self._writable()
+                continue
+            if not sent:
+                raise EOFError("Request cache file is truncated")
+            offset += sent
+            count -= sent
+
+    def close(self):
+        self._sock.close()
+
+
+async def open_stream(socket_path=None, host=None, port=None):
+    """Connect a socket and wrap it in an asyncio (reader, writer) pair."""
     sock = create_socket(socket_path, host, port)
+    if socket_path:
+        return await asyncio.open_unix_connection(sock=sock, limit=STREAM_LIMIT)
+    return await asyncio.open_connection(sock=sock, limit=STREAM_LIMIT)
+
+
+async def send_requests(writer, client_id, windows, req_nums, slots, inflight, wire="json",
+                        cache=None):
+    """Send the given requests of a client without waiting for responses."""
+    pending = []
+    pending_bytes = 0
+    sent = []
+    direct = SendfileWriter(writer) if cache is not None else None
+
+    async def flush():
+        nonlocal pending_bytes
+        start = time.perf_counter_ns()
+        if direct is not None:
+            for head, (offset, length) in pending:
+                # MSG_MORE lets TCP put the head in the same segment as the span
+                await direct.send(head, MSG_MORE)
+                await direct.sendfile(cache.file, offset, length)
+        else:
+            writer.writelines(pending)
+            await writer.drain()
+        for request_id, req_num, num_queries in sent:
+            inflight.put_nowait((request_id, req_num, num_queries, start))
+        pending.clear()
+        sent.clear()
+        pending_bytes = 0
+
+    try:
+        for req_num in req_nums:
+            window_num = req_num % len(windows)
+            queries, num_queries = windows[window_num]
+            request_id = REQUEST_ID % (client_id, req_num)
+            if cache is not None:
+                head = cache.head(request_id, window_num)
+                request = (head, cache.spans[window_num])
+                size = len(head) + cache.spans[window_num][1]
+            else:
+                request = encode_request(request_id, queries, wire)
+                size = len(request)
+
+            if slots.locked() and pending:
+                await flush()
+            await slots.acquire()
+            pending.append(request)
+            pending_bytes += size
+            sent.append((request_id, req_num, num_queries))
+            if len(pending) >= COALESCE_REQUESTS or pending_bytes >= COALESCE_BYTES:
+                await flush()
+        if pending:
+            await flush()
+    except Exception as e:
+        inflight.put_nowait(e)
+    else:
+        inflight.put_nowait(None)
+    finally:
+        if direct is not None:
+            direct.close()
 
+
+async def connect_and_warm_up(client_id, conn_num, windows,
+                              socket_path=None, host=None, port=None, wire="json"):
+    """Open a connection and complete one untimed request; returns (reader, writer, ttfr_ns)."""
+    start = time.perf_counter_ns()
+    reader, writer = await open_stream(socket_path, host, port)
+    try:
+        request_id = f"c{client_id}-k{conn_num}-warmup"
+        writer.write(encode_request(request_id, windows[0][0], wire))
+        await writer.drain()
+        result = decode_response(await read_response(reader, wire), wire)
+        if result.get("id") != request_id:
+            raise RuntimeError(f"Response {result.get('id')} does not match request {request_id}")
+    except Exception:
+        writer.close()
+        raise
+    return reader, writer, time.perf_counter_ns() - start
+
+
+async def run_connection(reader, writer, client_id, windows, req_nums, window, latencies,
+                         count_only=False, wire="json", cache=None):
+    """Run a share of a client's requests on one connection; returns (queries, matches)."""
     total_queries = 0
     total_matches = 0
-    latencies = []
-
-    for req_num in range(num_requests):
-        # Create batch request
-        batch_start = (req_num * batch_size) % len(urls)
-        batch_urls = urls[batch_start:batch_start + batch_size]
-        if len(batch_urls) < batch_size:
-            batch_urls += urls[:batch_size - len(batch_urls)]
-
-        request = json.dumps({
-            "id": f"c{client_id}-r{req_num}",
-            "queries": batch_urls
-        }) + "\n"
-
-        # Time the request
-        start = time.time()
-        sock.sendall(request.encode())
-
-        # Read response
-        response = b""
-        while b"\n" not in response:
-            chunk = sock.recv(65536)
-            if not chunk:
-                break
-            response += chunk
-
-        elapsed = time.time() - start
-        latencies.append(elapsed * 1000)  # Convert to ms
 
-        result = json.loads(response.decode())
-        total_queries += len(batch_urls)
-        for r in result.get("results", []):
-            total_matches += len(r.get("matches", []))
+    slots = asyncio.Semaphore(window)
+    inflight = asyncio.Queue()
+    sender = asyncio.create_task(
+        send_requests(writer, client_id, windows, req_nums, slots, inflight, wire, cache)
+    )
 
-    sock.close()
+    try:
+        while True:
+            item = await inflight.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            request_id, req_num, num_queries, start = item
+
+            response = await read_response(reader, wire)
+
+            latencies[req_num] = time.perf_counter_ns() - start
+            slots.release()
+
+            if count_only:
+                if not response.startswith(b'{"id":"%s"' % request_id.encode()):
+                    raise RuntimeError(f"Response {response[:40]!r} does not match request {request_id}")
+                total_matches += response.count(MATCH_MARKER)
+            else:
+                result = decode_response(response, wire)
+                if result.get("id") != request_id:
+                    raise RuntimeError(f"Response {result.get('id')} does not match request {request_id}")
+                for r in result.get("results", []):
+                    total_matches += len(r.get("matches", []))
+            total_queries += num_queries
+    finally:
+        sender.cancel()
+
+    return total_queries, total_matches
+
+
+async def open_pool(client_id, pool_size, windows,
+                    socket_path=None, host=None, port=None, wire="json"):
+    """Open and warm up a client's connections; returns connect_and_warm_up tuples."""
+    conns = []
+    try:
+        for conn_num in range(pool_size):
+            conns.append(await connect_and_warm_up(
+                client_id, conn_num, windows,
+                socket_path=socket_path, host=host, port=port, wire=wire
+            ))
+    except Exception:
+        for _, writer, _ in conns:
+            writer.close()
+        raise
+    return conns
+
+
+async def client_worker(client_id, conns, windows, num_requests, window=8, count_only=False,
+                        wire="json", cache=None):
+    """Coroutine for a single benchmark client."""
+    latencies = array("q", [0]) * num_requests
+    try:
+        client_start = time.perf_counter_ns()
+        outcomes = await asyncio.gather(*[
+            run_connection(reader, writer, client_id, windows,
+                           range(conn_num, num_requests, len(conns)), window, latencies,
+                           count_only, wire, cache)
+            for conn_num, (reader, writer, _) in enumerate(conns)
+        ])
+        total_ns = time.perf_counter_ns() - client_start
+    finally:
+        for _, writer, _ in conns:
+            writer.close()
 
     return {
         "client_id": client_id,
-        "queries": total_queries,
-        "matches": total_matches,
-        "latencies": latencies,
-        "total_time": sum(latencies) / 1000
+        "queries": sum(queries for queries, _ in outcomes),
+        "matches": sum(matches for _, matches in outcomes),
+        "latencies_ns": latencies,
+        "ttfrs_ns": [ttfr_ns for _, _, ttfr_ns in conns],
+        "total_time": total_ns / NS_PER_SEC
     }
 
 
-def percentile(data, p):
-    """Calculate percentile of sorted data."""
+# Set in each benchmark process so all their timed phases start together
+_start_barrier = None
+
+
+def init_process(barrier):
+    """ProcessPoolExecutor initializer: keep the shared start barrier."""
+    global _start_barrier
+    _start_barrier = barrier
+
+
+async def run_clients(args, windows, client_ids, cache=None):
+    """Run benchmark clients on one event loop; returns (outcomes, wall_time)."""
+    pools = await asyncio.gather(
+        *[
+            open_pool(
+                i, args.pool_size, windows,
+                socket_path=args.socket, host=args.host, port=args.port, wire=args.wire
+            )
+            for i in client_ids
+        ],
+        return_exceptions=True
+    )
+
+    if _start_barrier is not None:
+        try:
+            await asyncio.to_thread(_start_barrier.wait, BARRIER_TIMEOUT)
+        except Exception:
+            # Another process failed or timed out: no timed phase will run
+            for conns in pools:
+                if not isinstance(conns, Exception):
+                    for _, writer, _ in conns:
+                        writer.close()
+            raise
+
+    start = time.perf_counter_ns()
+    outcomes = await asyncio.gather(
+        *[
+            client_worker(i, conns, windows, args.requests, args.window, args.count_only,
+                          args.wire, cache)
+            for i, conns in zip(client_ids, pools)
+            if not isinstance(conns, Exception)
+        ],
+        return_exceptions=True
+    )
+    wall_time = (time.perf_counter_ns() - start) / NS_PER_SEC
+
+    failures = [conns for conns in pools if isinstance(conns, Exception)]
+    return failures + list(outcomes), wall_time
+
+
+def run_shared(args, shm_name, url_count, client_ids):
+    """Attach the packed URLs and run the given clients in this benchmark process."""
+    try:
+        urls = SharedUrls(shm_name, url_count, args.wire)
+        try:
+            windows = build_windows(urls, args.batch, args.requests)
+        finally:
+            urls.close()
+        cache = RequestCache(windows, args.wire) if args.sendfile else None
+        try:
+            return asyncio.run(run_clients(args, windows, client_ids, cache))
+        finally:
+            if cache is not None:
+                cache.close()
+    except BaseException:
+        # Release the other processes rather than leave them waiting out
+        # BARRIER_TIMEOUT
+        if _start_barrier is not None:
+            _start_barrier.abort()
+        raise
+
+
+def percentiles(data, ps):
+    """Calculate several percentiles of data, sorting it only once."""
     if not data:
-        return 0
+        return [0] * len(ps)
     sorted_data = sorted(data)
-    k = (len(sorted_data) - 1) * p / 100
-    f = int(k)
-    c = f + 1 if f + 1 < len(sorted_data) else f
-    return sorted_data[f] + (k - f) * (sorted_data[c] - sorted_data[f])
+    values = []
+    for p in ps:
+        k = (len(sorted_data) - 1) * p / 100
+        f = int(k)
+        c = f + 1 if f + 1 < len(sorted_data) else f
+        values.append(sorted_data[f] + (k - f) * (sorted_data[c] - sorted_data[f]))
+    return values
 
 
 def main():
@@ -119,14 +571,38 @@ def main():
     parser.add_argument("--port", "-P", type=int, help="TCP port")
     parser.add_argument("--urls", "-u", default="sample_urls.txt", help="URL file to use (default: sample_urls.txt)")
     parser.add_argument("--clients", "-c", type=int, default=4, help="Number of concurrent clients (default: 4)")
+    parser.add_argument("--procs", type=int, default=os.cpu_count(),
+                        help="Processes to spread clients over (default: CPU count)")
     parser.add_argument("--requests", "-r", type=int, default=100, help="Requests per client (default: 100)")
     parser.add_argument("--batch", "-b", type=int, default=100, help="URLs per request batch (default: 100)")
+    parser.add_argument("--window", "-w", type=int, default=1,
+                        help="Requests in flight per connection; above 1, latency includes "
+                             "queueing behind earlier requests (default: 1)")
+    parser.add_argument("--pool-size", type=int, default=1,
+                        help="Connections per client, used round-robin (default: 1)")
+    parser.add_argument("--count-only", action="store_true",
+                        help="Count matches by scanning responses instead of parsing the JSON")
+    parser.add_argument("--wire", choices=("json", "msgpack"), default="json",
+                        help="Wire format; msgpack frames are length-prefixed (default: json)")
+    parser.add_argument("--sendfile", action="store_true",
+                        help="Send each request's preserialized queries from a temp file "
+                             "with sendfile")
     parser.add_argument("--url-limit", type=int, default=5000, help="Max URLs to load (default: 5000)")
 
     args = parser.parse_args()
 
     if not args.socket and not args.port:
         parser.error("Either --socket or --port must be specified")
+    if args.window < 1:
+        parser.error("--window must be at least 1")
+    if args.pool_size < 1:
+        parser.error("--pool-size must be at least 1")
+    if args.procs < 1:
+        parser.error("--procs must be at least 1")
+    if args.wire == "msgpack" and msgpack is None:
+        parser.error("--wire=msgpack requires the msgpack package")
+    if args.wire == "msgpack" and args.count_only:
+        parser.error("--count-only scans JSON responses and cannot be used with --wire=msgpack")
 
     # Load URLs
     print(f"Loading URLs from {args.urls}...")
@@ -135,45 +611,70 @@ def main():
     except FileNotFoundError:
         print(f"Error: URL file '{args.urls}' not found")
         sys.exit(1)
+    if not urls:
+        print(f"Error: no URLs in '{args.urls}'")
+        sys.exit(1)
     print(f"Loaded {len(urls):,} URLs")
 
+    procs = min(args.procs, args.clients)
+
     # Print benchmark config
     transport = f"Unix socket: {args.socket}" if args.socket else f"TCP: {args.host}:{args.port}"
     total_queries = args.clients * args.requests * args.batch
 
     print(f"\nBenchmark Configuration:")
     print(f"  Transport: {transport}")
-    print(f"  Clients: {args.clients}")
+    print(f"  Clients: {args.clients} across {procs} processes")
     print(f"  Requests per client: {args.requests}")
     print(f"  URLs per batch: {args.batch}")
+    print(f"  Connections per client: {args.pool_size}")
+    print(f"  Requests in flight per connection: {args.window}")
+    print(f"  Wire format: {args.wire}{' (sendfile from cache)' if args.sendfile else ''}")
+    print(f"  Response parsing: {'byte scan (--count-only)' if args.count_only else 'full decode'}")
     print(f"  Total queries: {total_queries:,}")
     print("-" * 60)
 
-    # Run benchmark
-    start = time.time()
-
-    with ThreadPoolExecutor(max_workers=args.clients) as executor:
-        futures = [
-            executor.submit(
-                client_worker, i, urls, args.requests, args.batch,
-                socket_path=args.socket, host=args.host, port=args.port
-            )
-            for i in range(args.clients)
-        ]
-
-        results = []
-        for future in as_completed(futures):
-            try:
-                results.append(future.result())
-            except Exception as e:
-                print(f"Client error: {e}")
-
-    total_elapsed = time.time() - start
+    # Run benchmark: clients are spread over processes, each running its
+    # share on one event loop and reading URLs from shared memory
+    shm = pack_urls(urls, args.wire)
+    outcomes = []
+    total_elapsed = 0
+    try:
+        barrier = multiprocessing.Barrier(procs)
+        with ProcessPoolExecutor(max_workers=procs, initializer=init_process,
+                                 initargs=(barrier,)) as executor:
+            futures = [
+                executor.submit(run_shared, args, shm.name, len(urls),
+                                range(k, args.clients, procs))
+                for k in range(procs)
+            ]
+            for future in futures:
+                try:
+                    process_outcomes, wall_time = future.result()
+                except Exception as e:
+                    print(f"Process error: {type(e).__name__}: {e}")
+                    continue
+                outcomes.extend(process_outcomes)
+                total_elapsed = max(total_elapsed, wall_time)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            print(f"Client error: {outcome}")
+        else:
+            results.append(outcome)
+    if not results:
+        print("Error: no benchmark client completed")
+        sys.exit(1)
 
     # Aggregate results
     total_queries = 0
     total_matches = 0
-    all_latencies = []
+    all_latencies = array("q")
+    all_ttfrs = []
 
     for r in sorted(results, key=lambda x: x["client_id"]):
         qps = r["queries"] / r["total_time"]
@@ -181,24 +682,32 @@ def main():
               f"{r['total_time']:.2f}s, {qps:,.0f} q/s")
         total_queries += r["queries"]
         total_matches += r["matches"]
-        all_latencies.extend(r["latencies"])
+        all_latencies.extend(r["latencies_ns"])
+        all_ttfrs.extend(r["ttfrs_ns"])
 
     # Calculate statistics
     combined_qps = total_queries / total_elapsed
-    avg_latency = sum(all_latencies) / len(all_latencies) if all_latencies else 0
-    p50 = percentile(all_latencies, 50)
-    p95 = percentile(all_latencies, 95)
-    p99 = percentile(all_latencies, 99)
+    # Latencies stay integer ns until here; convert only the reported values
+    avg_latency = sum(all_latencies) / len(all_latencies) / NS_PER_MS if all_latencies else 0
+    p50, p95, p99 = (ns / NS_PER_MS for ns in percentiles(all_latencies, (50, 95, 99)))
 
     print("-" * 60)
     print(f"Combined: {total_queries:,} queries, {total_matches:,} matches")
     print(f"Wall time: {total_elapsed:.2f}s")
     print(f"Throughput: {combined_qps:,.0f} queries/sec")
-    print(f"\nLatency (per batch of {args.batch} URLs):")
+    if args.window > 1:
+        print(f"\nLatency (per batch of {args.batch} URLs, pipelined: includes queueing "
+              f"behind up to {args.window - 1} earlier requests):")
+    else:
+        print(f"\nLatency (per batch of {args.batch} URLs):")
     print(f"  Mean: {avg_latency:.2f}ms")
     print(f"  p50:  {p50:.2f}ms")
     print(f"  p95:  {p95:.2f}ms")
     print(f"  p99:  {p99:.2f}ms")
+    if all_ttfrs:
+        print("\nTime to first response (connect + untimed warm-up request):")
+        print(f"  Mean: {sum(all_ttfrs) / len(all_ttfrs) / NS_PER_MS:.2f}ms")
+        print(f"  Max:  {max(all_ttfrs) / NS_PER_MS:.2f}ms")
 
 
 if __name__ == "__main__":
@@ -23,6 +23,28 @@ import sys
 import time
 from typing import List, Dict, Any, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+else:
+    def json_dumps(obj: Any) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes."""
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def json_loads(data) -> Any:
+        """Parse JSON from bytes or a memoryview."""
+        return json.loads(bytes(data))
+
+
+RECV_BUF_SIZE = 1 << 20
+TCP_BUF_SIZE = 4 << 20
+
 
 class PrefixMatchClient:
     """Client for PrefixMatch server."""
@@ -45,12 +67,22 @@ class PrefixMatchClient:
         """
         self.request_id = 0
 
+        # Reusable receive buffer; [_recv_start, _recv_end) is unconsumed data
+        self._recv_buf = bytearray(RECV_BUF_SIZE)
+        self._view = memoryview(self._recv_buf)
+        self._recv_start = 0
+        self._recv_end = 0
+
         if unix_socket:
             self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
             self.sock.connect(unix_socket)
             self.endpoint = f"unix:{unix_socket}"
         else:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Disable Nagle for small request/response round trips
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, TCP_BUF_SIZE)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, TCP_BUF_SIZE)
             self.sock.connect((host, port))
             self.endpoint = f"tcp:{host}:{port}"
 
@@ -76,18 +108,44 @@ class PrefixMatchClient:
         }
 
         # Send request
-        request_bytes = (json.dumps(request) + "\n").encode("utf-8")
-        self.sock.sendall(request_bytes)
-
-        # Read response
-        response = b""
-        while b"\n" not in response:
-            chunk = self.sock.recv(1048576)
-            if not chunk:
-                raise ConnectionError("Server closed connection")
-            response += chunk
+        self.sock.sendall(json_dumps(request) + b"\n")
+
+        return json_loads(self._recv_line())
+
+    def _recv_line(self) -> memoryview:
+        """
+        Read one response line from the socket.
 
-        return json.loads(response.decode("utf-8").strip())
+        Returns:
+            View of the response bytes without the trailing newline, valid
+            until the next read
+        """
+        # Move any bytes received past the previous line to the front
+        if self._recv_start:
+            remaining = self._recv_end - self._recv_start
+            self._recv_buf[:remaining] = self._recv_buf[self._recv_start:self._recv_end]
+            self._recv_start = 0
+            self._recv_end = remaining
+
+        search_from = 0
+        while True:
+            idx = self._recv_buf.find(b"\n", search_from, self._recv_end)
+            if idx >= 0:
+                self._recv_start = idx + 1
+                return self._view[:idx]
+            search_from = self._recv_end
+
+            if self._recv_end == len(self._recv_buf):
+                # Response larger than the buffer: double it, keeping what we have
+                grown = bytearray(2 * len(self._recv_buf))
+                grown[:self._recv_end] = self._view[:self._recv_end]
+                self._recv_buf = grown
+                self._view = memoryview(grown)
+
+            n = self.sock.recv_into(self._view[self._recv_end:])
+            if not n:
+                raise ConnectionError("Server closed connection")
+            self._recv_end += n
 
     def query_single(self, url: str) -> List[Dict[str, str]]:
         """
@@ -99,10 +157,9 @@ class PrefixMatchClient:
         Returns:
             List of match dictionaries
         """
+        # A one-query request is answered with its matches as the results
         result = self.query([url])
-        if result.get("results") and len(result["results"]) > 0:
-            return result["results"][0].get("matches", [])
-        return []
+        return result.get("results", [])
 
     def close(self):
         """Close the connection."""
@@ -153,16 +210,16 @@ def demo_batch_query(client: PrefixMatchClient):
         "https://bloomberg.com/markets",
     ]
 
-    start = time.time()
+    start = time.perf_counter()
     result = client.query(urls)
-    elapsed = (time.time() - start) * 1000
+    elapsed = (time.perf_counter() - start) * 1000
 
     print(f"  Queried {len(urls)} URLs in {elapsed:.2f}ms")
     print(f"  Request ID: {result['id']}")
     print()
 
     for r in result.get("results", []):
-        url = r["query"]
+        url = urls[r["index"]]
         matches = r.get("matches", [])
         if matches:
             categories = [m["category"] for m in matches]
@@ -184,10 +241,10 @@ def demo_performance(client: PrefixMatchClient, iterations: int = 1000):
         client.query_single(test_url)
 
     # Measure single queries
-    start = time.time()
+    start = time.perf_counter()
     for _ in range(iterations):
         client.query_single(test_url)
-    elapsed = time.time() - start
+    elapsed = time.perf_counter() - start
 
     print(f"  Single queries: {iterations} iterations")
     print(f"  Total time: {elapsed*1000:.2f}ms")
@@ -200,10 +257,10 @@ def demo_performance(client: PrefixMatchClient, iterations: int = 1000):
     batch = [test_url] * batch_size
     batch_iterations = iterations // batch_size
 
-    start = time.time()
+    start = time.perf_counter()
     for _ in range(batch_iterations):
         client.query(batch)
-    elapsed = time.time() - start
+    elapsed = time.perf_counter() - start
 
     total_queries = batch_iterations * batch_size
     print(f"  Batch queries: {batch_iterations} batches x {batch_size}")
@@ -221,14 +278,16 @@ def process_file(
     """Process a file of URLs."""
     print(f"\n=== Processing File: {filepath} ===\n")
 
-    # Read URLs
-    with open(filepath, "r") as f:
-        urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    # Read URLs, splitting and stripping in C rather than per line in Python
+    with open(filepath, "rb") as f:
+        lines = f.read().splitlines()
+    # Only lines starting with '#' are comments; indented ones are queries
+    urls = [line.strip().decode() for line in lines if line[:1] != b"#" and line.strip()]
 
     print(f"  Loaded {len(urls)} URLs")
 
     total_matches = 0
-    start = time.time()
+    start = time.perf_counter()
 
     # Process in batches
     for i in range(0, len(urls), batch_size):
@@ -240,14 +299,14 @@ def process_file(
             total_matches += len(matches)
 
             if verbose and matches:
-                print(f"  {r['query']}: {[m['category'] for m in matches]}")
+                print(f"  {batch[r['index']]}: {[m['category'] for m in matches]}")
 
         # Progress
         progress = min(i + batch_size, len(urls))
         if progress % 1000 == 0 or progress == len(urls):
             print(f"  Processed {progress}/{len(urls)} URLs...")
 
-    elapsed = time.time() - start
+    elapsed = time.perf_counter() - start
 
     print()
     print(f"  Total URLs: {len(urls)}")